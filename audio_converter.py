@@ -2,49 +2,83 @@ import yt_dlp
 from pathlib import Path
 import unicodedata
 import re
+import threading
+from contextlib import nullcontext
+from typing import Iterable, List
+from concurrent.futures import ThreadPoolExecutor, as_completed
 
 # Configuration options
 VERBOSE = False  # Toggle True for verbose output
+MAX_WORKERS = 2  # Number of concurrent downloads; kept low to avoid YouTube rate limiting
+FRAGMENT_WORKERS = 4  # Number of parallel range requests per download
 
 # Pre-compiled regex patterns for filename sanitization
 ILLEGAL_CHAR_PATTERN = re.compile(r'[^\w\s-]')
-SPACE_PATTERN = re.compile(r'\s+')
+# Translation table deleting the ASCII characters ILLEGAL_CHAR_PATTERN would remove
+ASCII_ILLEGAL_CHAR_TABLE = str.maketrans({c: None for c in map(chr, range(128)) if ILLEGAL_CHAR_PATTERN.match(c)})
 YOUTUBE_URL_REGEX = re.compile(
     r'^(https?://)?(www\.)?(youtube\.com/watch\?v=|youtube\.[a-z]{2,3}/watch\?v=|youtu\.be/)[^&\s]+$',
     re.IGNORECASE
 )
+VIDEO_ID_REGEX = re.compile(r'(?:v=|youtu\.be/)([\w-]{11})', re.IGNORECASE)
 
 def is_valid_youtube_url(url: str) -> bool:
     """Validate if the provided URL is a valid YouTube video URL."""
-    return bool(YOUTUBE_URL_REGEX.match(url))
+    # Every match has "youtu" within its first 17 characters ("https://www." + "youtu"),
+    # so most non-YouTube lines are rejected without running the regex
+    return 'youtu' in url[:17].lower() and YOUTUBE_URL_REGEX.match(url) is not None
+
+def unique_video_urls(urls: Iterable[str]) -> List[str]:
+    """Keep only the first URL for each video ID, however the link to it is written."""
+    urls_by_video = {}
+    for url in urls:
+        id_match = VIDEO_ID_REGEX.search(url)
+        # A URL without a recognisable video ID is only deduplicated against itself
+        urls_by_video.setdefault(id_match.group(1) if id_match else url, url)
+    return list(urls_by_video.values())
+
+def underscore_whitespace(text: str) -> str:
+    """Replace every run of whitespace in a string with a single underscore."""
+    words = text.split()
+    joined = '_'.join(words)
+    # str.split() drops leading and trailing whitespace, but each of those runs still becomes an underscore
+    if text[:1].isspace():
+        joined = '_' + joined
+    if words and text[-1:].isspace():
+        joined += '_'
+    return joined
 
 def sanitize_filename(title: str, max_length=255) -> str:
     """Sanitize a string to create a safe and clean filename, considering maximum length."""
+    if title.isascii():
+        # Normalization is a no-op for ASCII and every character is a single byte
+        sanitized_title = title.translate(ASCII_ILLEGAL_CHAR_TABLE)
+        sanitized_title = underscore_whitespace(sanitized_title).strip(".")
+        return sanitized_title[:max_length].rstrip('_')
+
     sanitized_title = unicodedata.normalize('NFKD', title)
     sanitized_title = ILLEGAL_CHAR_PATTERN.sub('', sanitized_title)
-    sanitized_title = SPACE_PATTERN.sub('_', sanitized_title).strip(".")
-    sanitized_title = sanitized_title.encode('utf-8')[:max_length].decode('utf-8', 'ignore').rstrip('_')
-    return unicodedata.normalize('NFC', sanitized_title)
-
-def download_and_process_video(video_url: str, folder_name: str = "Downloaded_Videos_Audio", verbose=False, cookies_file=None):
-    """
-    Download a YouTube video using yt-dlp, merge streams if necessary,
-    and extract audio to WAV format.
-    """
-    if not is_valid_youtube_url(video_url):
-        return False, f"Invalid URL: {video_url}"
-
-    download_path = Path(folder_name)
-    download_path.mkdir(parents=True, exist_ok=True)
-
-    # Prepare yt-dlp options
-    ydl_opts = {
+    sanitized_title = underscore_whitespace(sanitized_title).strip(".")
+    # A UTF-8 character is at most 4 bytes, so short titles can skip the byte-length check
+    if len(sanitized_title) > max_length // 4:
+        encoded_title = sanitized_title.encode('utf-8')
+        if len(encoded_title) > max_length:
+            sanitized_title = encoded_title[:max_length].decode('utf-8', 'ignore')
+    return unicodedata.normalize('NFC', sanitized_title.rstrip('_'))
+
+def build_ydl_opts(download_path: Path, verbose=False, cookies_file=None) -> dict:
+    """Build the yt-dlp options for downloading a video and extracting its audio to WAV."""
+    return {
         'format': 'bestvideo+bestaudio/best',
         'outtmpl': str(download_path / '%(title)s.%(ext)s'),
         'quiet': not verbose,
         'no_warnings': not verbose,
         'cookiefile': str(cookies_file) if cookies_file else None,
         'merge_output_format': 'mp4',
+        'buffersize': 1024 * 1024,  # Read 1 MiB at a time instead of yt-dlp's 1 KiB default
+        # Expose YouTube's HTTPS formats as ranged fragments so each one is fetched over several connections
+        'extractor_args': {'youtube': {'formats': ['dashy']}},
+        'concurrent_fragment_downloads': FRAGMENT_WORKERS,
         'postprocessors': [
             {
                 'key': 'FFmpegExtractAudio',
@@ -54,23 +88,52 @@ def download_and_process_video(video_url: str, folder_name: str = "Downloaded_Vi
         ],
     }
 
+def download_and_process_video(video_url: str, folder_name: str = "Downloaded_Videos_Audio", verbose=False, cookies_file=None, skip_validation=False, ydl=None):
+    """
+    Download a YouTube video using yt-dlp, merge streams if necessary,
+    and extract audio to WAV format. Pass skip_validation=True for URLs
+    the caller has already validated, and an existing YoutubeDL instance
+    as ydl to reuse it instead of creating a new one.
+    """
+    if not skip_validation and not is_valid_youtube_url(video_url):
+        return False, f"Invalid URL: {video_url}"
+
+    download_path = Path(folder_name)
+    download_path.mkdir(parents=True, exist_ok=True)
+
+    if ydl is None:
+        ydl_context = yt_dlp.YoutubeDL(build_ydl_opts(download_path, verbose, cookies_file))
+    else:
+        ydl_context = nullcontext(ydl)
+
     try:
-        with yt_dlp.YoutubeDL(ydl_opts) as ydl:
-            info_dict = ydl.extract_info(video_url, download=True)
+        with ydl_context as ydl:
+            info_dict = ydl.extract_info(video_url, download=False)
             title = sanitize_filename(info_dict.get('title', 'video'))
-            video_file = download_path / f"{title}.mp4"
-            audio_file = download_path / f"{title}.wav"
 
-            if verbose:
-                print(f"Video saved to: '{video_file}'")
-                print(f"Audio extracted to WAV format: '{audio_file}'")
+            # FFmpegExtractAudio swaps the extension of yt-dlp's output file for .wav and,
+            # without keepvideo, deletes the merged video, so yt-dlp itself would download it again
+            audio_file = Path(yt_dlp.utils.replace_extension(
+                ydl.prepare_filename(info_dict), 'wav', info_dict.get('ext')
+            ))
+            if audio_file.exists() and audio_file.stat().st_size > 0:
+                return True, f"Already downloaded: {title}"
+
+            # Download from the info already extracted instead of fetching the video page again
+            ydl.process_ie_result(info_dict, download=True)
+
+        video_file = download_path / f"{title}.mp4"
 
-            return True, f"Downloaded and processed: {title}"
+        if verbose:
+            print(f"Video saved to: '{video_file}'")
+            print(f"Audio extracted to WAV format: '{audio_file}'")
+
+        return True, f"Downloaded and processed: {title}"
 
     except yt_dlp.utils.DownloadError as e:
         return False, f"Error downloading {video_url}: {e}"
 
-def download_videos_from_file(file_path: str, folder_name: str = "Downloaded_Videos_Audio", verbose=False, cookies_file=None):
+def download_videos_from_file(file_path: str, folder_name: str = "Downloaded_Videos_Audio", verbose=False, cookies_file=None, max_workers: int = MAX_WORKERS):
     file_path = Path(file_path)
 
     if not file_path.exists():
@@ -78,23 +141,49 @@ def download_videos_from_file(file_path: str, folder_name: str = "Downloaded_Vid
         file_path.touch()
         return
 
-    urls = file_path.read_text().splitlines()
-    if not urls:
+    if file_path.stat().st_size == 0:
         print(f"'{file_path.name}' is empty. Please add some video URLs to it.")
         return
 
-    valid_urls = [url.strip() for url in urls if is_valid_youtube_url(url.strip())]
+    # Validate lines as they are read rather than holding the whole file in memory first,
+    # dropping repeated links so each video is only fetched once
+    with file_path.open('r', encoding='utf-8') as url_file:
+        valid_urls = unique_video_urls(url for url in map(str.strip, url_file) if is_valid_youtube_url(url))
     if not valid_urls:
         print(f"No valid video URLs found in '{file_path.name}'.")
         return
 
-    print(f"Starting downloads for {len(valid_urls)} valid video URL(s)...")
-    for index, url in enumerate(valid_urls, start=1):
-        success, message = download_and_process_video(
-            url, folder_name, verbose=verbose, cookies_file=cookies_file
+    download_path = Path(folder_name)
+
+    # YoutubeDL instances are not thread-safe, so each worker thread keeps its own
+    # and reuses it for every URL it handles instead of rebuilding one per video
+    thread_state = threading.local()
+    ydl_instances = []
+
+    def download(url):
+        ydl = getattr(thread_state, 'ydl', None)
+        if ydl is None:
+            ydl = thread_state.ydl = yt_dlp.YoutubeDL(build_ydl_opts(download_path, verbose, cookies_file))
+            ydl_instances.append(ydl)
+        return download_and_process_video(
+            url, folder_name, verbose=verbose, cookies_file=cookies_file, skip_validation=True, ydl=ydl
         )
-        status = "Success" if success else "Failed"
-        print(f"{index}. [{status}] {message}")
+
+    print(f"Starting downloads for {len(valid_urls)} valid video URL(s)...")
+    try:
+        with ThreadPoolExecutor(max_workers=max_workers) as executor:
+            future_to_url = {executor.submit(download, url): url for url in valid_urls}
+            for index, future in enumerate(as_completed(future_to_url), start=1):
+                url = future_to_url[future]
+                try:
+                    success, message = future.result()
+                except Exception as e:
+                    success, message = False, f"Exception occurred while downloading {url}: {e}"
+                status = "Success" if success else "Failed"
+                print(f"{index}. [{status}] {message}")
+    finally:
+        for ydl in ydl_instances:
+            ydl.close()
 
     print("Download session completed.")
 
@@ -142,7 +231,7 @@ def run_ui():
             if is_valid_youtube_url(video_url):
                 cookies_file = get_cookies_file()
                 success, message = download_and_process_video(
-                    video_url, "Downloaded_Videos_Audio", cookies_file=cookies_file
+                    video_url, "Downloaded_Videos_Audio", cookies_file=cookies_file, skip_validation=True
                 )
                 print(message if success else f"Failed to download: {message}")
             else:
@@ -1,19 +1,35 @@
 import logging
-import multiprocessing
+import os
+import queue
 import re
+import shlex
 import subprocess
-from concurrent.futures import ThreadPoolExecutor, as_completed
+import threading
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from functools import lru_cache
 from pathlib import Path
+from typing import Iterator, Optional, Tuple
 
 import cv2
-import numpy as np
 import pytesseract
 from PIL import Image
 from tqdm import tqdm
 
+try:
+    # Optional: keeps the Tesseract model loaded between images instead of launching a process per image
+    import tesserocr
+except ImportError:
+    tesserocr = None
+
 # Specify the Tesseract command path if it's not in the system's PATH
 # pytesseract.pytesseract.tesseract_cmd = r'<path_to_your_tesseract_executable>'
 
+# Lowercase file extensions treated as images
+IMAGE_EXTENSIONS = ('.jpg', '.jpeg', '.png', '.gif', '.bmp', '.tif', '.tiff')
+
+# Per-worker tesserocr API instances, keyed by Tesseract configuration
+_thread_local = threading.local()
+
 def check_tesseract_installed(min_version=5):
     """Check if Tesseract is installed and meets the minimum version requirement."""
     try:
@@ -42,66 +58,145 @@ def check_tesseract_installed(min_version=5):
 
 def is_image_file(filename: str) -> bool:
     """Check if a file is an image based on its extension."""
-    return re.search(r'\.(jpe?g|png|gif|bmp|tiff?)$', filename, re.IGNORECASE) is not None
+    return filename.lower().endswith(IMAGE_EXTENSIONS)
+
+
+def iter_image_files(directory: str) -> Iterator[Path]:
+    """Yield the image files directly inside a directory, using cached scandir entries instead of extra stat calls."""
+    with os.scandir(directory) as entries:
+        for entry in entries:
+            if is_image_file(entry.name) and entry.is_file():
+                yield Path(entry.path)
 
 
 def preprocess_image(image_path: Path) -> Image.Image:
     """Preprocess the image for improved OCR accuracy."""
     image_cv = cv2.imread(str(image_path))
     gray = cv2.cvtColor(image_cv, cv2.COLOR_BGR2GRAY)
-    blur = cv2.GaussianBlur(gray, (5, 5), 0)
-    _, binarized = cv2.threshold(blur, 0, 255, cv2.THRESH_BINARY + cv2.THRESH_OTSU)
 
-    kernel = np.ones((1, 1), np.uint8)
-    img_dilated = cv2.dilate(binarized, kernel, iterations=1)
-    img_eroded = cv2.erode(img_dilated, kernel, iterations=1)
-
-    scale_percent = 150  # percent of original size
-    width = int(img_eroded.shape[1] * scale_percent / 100)
-    height = int(img_eroded.shape[0] * scale_percent / 100)
-    resized = cv2.resize(img_eroded, (width, height), interpolation=cv2.INTER_AREA)
+    # Upscale first so blurring and binarization happen once, at the final resolution
+    scale = 1.5  # 150% of original size
+    resized = cv2.resize(gray, None, fx=scale, fy=scale, interpolation=cv2.INTER_CUBIC)
+    blur = cv2.GaussianBlur(resized, (3, 3), 0)
+    _, binarized = cv2.threshold(blur, 0, 255, cv2.THRESH_BINARY + cv2.THRESH_OTSU)
 
-    return Image.fromarray(resized)
+    return Image.fromarray(binarized)
 
 
-def extract_text(image_path: Path, output_file: Path, tesseract_config: str = ''):
-    """Extract text from a single image and append it to the output file."""
+@lru_cache(maxsize=None)
+def tesserocr_options(tesseract_config: str) -> Optional[dict]:
+    """
+    Translate Tesseract command-line options into tesserocr.PyTessBaseAPI arguments.
+    Returns None if the configuration uses an option tesserocr cannot express.
+    """
+    options = {'lang': 'eng'}
+    variables = {}
+    args = iter(shlex.split(tesseract_config, posix=os.name != 'nt'))
     try:
-        image = preprocess_image(image_path)
-        text = pytesseract.image_to_string(image, config=tesseract_config)
-        with output_file.open("a", encoding="utf-8") as file_out:
-            file_out.write(f"--- {image_path.name} ---\n{text}\n\n")
-        print(f"Processed: {image_path.name}")
-    except Exception as e:
-        print(f"Failed to process {image_path.name}: {e}")
-
-
-def extract_text_from_images(directory: str, tesseract_config: str = '', output_dir: str = None):
+        for arg in args:
+            if arg == '-l':
+                options['lang'] = next(args)
+            elif arg == '--oem':
+                options['oem'] = int(next(args))
+            elif arg == '--psm':
+                options['psm'] = int(next(args))
+            elif arg == '--tessdata-dir':
+                options['path'] = next(args)
+            elif arg == '-c':
+                name, _, value = next(args).partition('=')
+                variables[name] = value
+            else:
+                return None
+    except (StopIteration, ValueError):
+        return None
+    if variables:
+        options['variables'] = variables
+    return options
+
+
+def ocr_image(image: Image.Image, tesseract_config: str = '') -> str:
+    """Run OCR on a preprocessed image, reusing this worker's Tesseract instance when tesserocr is available."""
+    options = tesserocr_options(tesseract_config) if tesserocr else None
+    if options is None:
+        return pytesseract.image_to_string(image, config=tesseract_config)
+
+    apis = getattr(_thread_local, 'apis', None)
+    if apis is None:
+        apis = _thread_local.apis = {}
+    api = apis.get(tesseract_config)
+    if api is None:
+        # Loading the language model is the expensive part, so do it once per worker
+        api = apis[tesseract_config] = tesserocr.PyTessBaseAPI(**options)
+    api.SetImage(image)
+    return api.GetUTF8Text()
+
+
+def init_worker():
+    """Limit OpenCV to one thread per worker process so the pool does not oversubscribe the CPU."""
+    cv2.setNumThreads(1)
+
+
+def extract_text(image_path: Path, tesseract_config: str = '') -> Tuple[str, str]:
+    """Extract text from a single image and return the image name with its text."""
+    image = preprocess_image(image_path)
+    text = ocr_image(image, tesseract_config)
+    return image_path.name, text
+
+
+def write_results(result_queue: queue.Queue, output_file: Path):
+    """Write (image name, text) results from the queue to the output file until None is received."""
+    with output_file.open("w", encoding="utf-8") as file_out:
+        while True:
+            result = result_queue.get()
+            if result is None:
+                break
+            name, text = result
+            file_out.write(f"--- {name} ---\n{text}\n\n")
+
+
+def extract_text_from_images(directory: str, tesseract_config: str = '', output_dir: str = None) -> bool:
     """
     Extract text from images in the specified directory and save the extracted text to a file.
+    Returns False without creating or truncating any output if the directory does not exist.
     """
+    # Checked up front: scandir would otherwise raise inside the pool after the output file was truncated
+    if not Path(directory).is_dir():
+        print(f"Directory '{directory}' not found. Please enter the path to an existing folder of images.")
+        return False
+
     if output_dir is None:
         output_dir = Path(directory) / "extracted_texts"
     else:
         output_dir = Path(output_dir)
     output_dir.mkdir(parents=True, exist_ok=True)
     output_file = output_dir / "extracted_text.txt"
-    output_file.write_text("", encoding="utf-8")  # Clear the output file at the start
 
-    image_paths = [file for file in Path(directory).glob('*') if is_image_file(file.name)]
+    # A single writer thread keeps the output file open for the whole run
+    result_queue = queue.Queue()
+    writer = threading.Thread(target=write_results, args=(result_queue, output_file))
+    writer.start()
 
-    executor_workers = min(32, max(4, multiprocessing.cpu_count() + 4))
-    with ThreadPoolExecutor(max_workers=executor_workers) as executor:
-        future_to_image = {executor.submit(extract_text, image_path, output_file, tesseract_config): image_path for image_path in image_paths}
-        
-        # Wrap the as_completed iterator with tqdm for progress visualization
-        for future in tqdm(as_completed(future_to_image), total=len(future_to_image), desc="Processing Images"):
-            image_path = future_to_image[future]
-            try:
-                future.result()
-                logging.info(f"Processed: {image_path}")
-            except Exception as e:
-                logging.error(f"Failed to process {image_path}: {e}")
+    try:
+        # Worker processes let image preprocessing run in parallel instead of contending for the GIL
+        with ProcessPoolExecutor(max_workers=os.cpu_count(), initializer=init_worker) as executor:
+            future_to_image = {executor.submit(extract_text, image_path, tesseract_config): image_path for image_path in iter_image_files(directory)}
+
+            # Report progress through tqdm, showing the most recently finished image
+            with tqdm(total=len(future_to_image), desc="Processing Images") as progress:
+                for future in as_completed(future_to_image):
+                    image_path = future_to_image[future]
+                    try:
+                        result_queue.put(future.result())
+                        logging.info(f"Processed: {image_path}")
+                    except Exception as e:
+                        logging.error(f"Failed to process {image_path}: {e}")
+                    progress.set_postfix_str(image_path.name, refresh=False)
+                    progress.update(1)
+    finally:
+        result_queue.put(None)
+        writer.join()
+
+    return True
 
 
 if __name__ == "__main__":
@@ -115,5 +210,5 @@ if __name__ == "__main__":
         user_input = input(f"Enter Tesseract configuration options (default is '{default_tesseract_config}'). Press Enter to use default or specify new options: ")
         tesseract_config = user_input.strip() if user_input.strip() else default_tesseract_config
 
-        extract_text_from_images(directory_path, tesseract_config)
-        print("Text extraction completed.")
+        if extract_text_from_images(directory_path, tesseract_config):
+            print("Text extraction completed.")
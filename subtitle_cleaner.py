@@ -1,8 +1,22 @@
+import html
 import re
+from itertools import groupby
 from pathlib import Path
 from typing import List
 import nltk
 
+# Make sure the Punkt sentence tokenizer models are available once, not on every file
+nltk.download('punkt', quiet=True)
+
+# Single pre-compiled pattern matching everything in a VTT file that is not caption text
+VTT_NOISE_REGEX = re.compile(
+    r'^[ \t]*(?:WEBVTT|Kind:|Language:'                            # header lines
+    r'|\d{2}:\d{2}:\d{2}\.\d{3} --> \d{2}:\d{2}:\d{2}\.\d{3}).*$'   # timecode lines
+    r'|^.*(?:align:|position:).*$'                                  # cue setting lines
+    r'|<[^>\n]*>',                                                  # inline timestamps and tags
+    re.MULTILINE
+)
+
 def process_subtitle_file(input_file: Path) -> List[str]:
     """
     Processes the subtitle file by removing redundancy, cleaning up text,
@@ -14,42 +28,17 @@ def process_subtitle_file(input_file: Path) -> List[str]:
     Returns:
         List[str]: A list of tokenized sentences.
     """
-    # Initialize variables
-    current_text = ''
-    previous_text = ''
-
-    # Regular expressions for cleaning
-    timestamp_regex = re.compile(r'<\d{2}:\d{2}:\d{2}\.\d{3}>')
-    tag_regex = re.compile(r'</?c>')
-    timecode_line_regex = re.compile(
-        r'\d{2}:\d{2}:\d{2}\.\d{3} --> \d{2}:\d{2}:\d{2}\.\d{3}.*'
-    )
-
-    # Read and process the file line by line
-    with open(input_file, 'r', encoding='utf-8') as f:
-        for line in f:
-            line = line.strip()
-            if not line or line.startswith(('WEBVTT', 'Kind:', 'Language:')):
-                continue
-            if timecode_line_regex.match(line):
-                continue
-            if 'align:' in line or 'position:' in line:
-                continue
-            # Remove inline timestamps and tags
-            cleaned_line = timestamp_regex.sub('', line)
-            cleaned_line = tag_regex.sub('', cleaned_line)
-            cleaned_line = cleaned_line.strip()
-            if not cleaned_line:
-                continue
-            if cleaned_line != previous_text:
-                current_text += ' ' + cleaned_line
-                previous_text = cleaned_line
-
-    # Ensure punctuation is preserved
-    current_text = current_text.strip()
+    # Strip headers, timecodes, inline timestamps and tags in one pass over the file,
+    # then decode escaped characters such as &amp; in the remaining caption text,
+    # turning the non-breaking spaces from &nbsp; into plain spaces for tokenization
+    data = VTT_NOISE_REGEX.sub('', input_file.read_text(encoding='utf-8'))
+    data = html.unescape(data).replace('\xa0', ' ')
+
+    # Keep non-empty lines, dropping the repeats that rolling captions produce
+    lines = [line.strip() for line in data.splitlines()]
+    current_text = ' '.join(line for line, _ in groupby(filter(None, lines)))
 
     # Tokenize sentences using NLTK
-    nltk.download('punkt', quiet=True)
     sentences = nltk.sent_tokenize(current_text)
 
     return sentences
@@ -72,11 +61,12 @@ def main():
         # Generate a cleaned subtitle filename
         cleaned_file = cleaned_subtitles_folder / subtitle_file.name
 
-        # Write the cleaned sentences to the new file
-        with open(cleaned_file, 'w', encoding='utf-8') as f:
-            for idx, sentence in enumerate(sentences, 1):
-                f.write(f"{idx}. {sentence}\n")
-        
+        # Write the cleaned sentences to the new file in a single call
+        cleaned_file.write_text(
+            ''.join(f"{idx}. {sentence}\n" for idx, sentence in enumerate(sentences, 1)),
+            encoding='utf-8'
+        )
+
         print(f"Saved cleaned subtitles to: {cleaned_file}")
 
 if __name__ == '__main__':
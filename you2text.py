@@ -1,30 +1,91 @@
 import yt_dlp
 from pathlib import Path
-from typing import Optional
+from typing import Iterable, List, Optional
 import re
+import threading
 import unicodedata
+from contextlib import nullcontext
+from concurrent.futures import ThreadPoolExecutor, as_completed
+
+# Configuration options
+MAX_WORKERS = 8  # Number of threads for concurrent downloads
 
 # Pre-compiled regex patterns for filename sanitization
 ILLEGAL_CHAR_PATTERN = re.compile(r'[^\w\s-]')
-SPACE_PATTERN = re.compile(r'\s+')
+# Translation table deleting the ASCII characters ILLEGAL_CHAR_PATTERN would remove
+ASCII_ILLEGAL_CHAR_TABLE = str.maketrans({c: None for c in map(chr, range(128)) if ILLEGAL_CHAR_PATTERN.match(c)})
 YOUTUBE_URL_REGEX = re.compile(
     r'^(https?://)?(www\.)?'
     r'(youtube\.com/watch\?v=|youtube\.[a-z]{2,3}/watch\?v=|youtu\.be/)'
     r'[^&\s]+$',
     re.IGNORECASE
 )
+VIDEO_ID_REGEX = re.compile(r'(?:v=|youtu\.be/)([\w-]{11})', re.IGNORECASE)
 
 def is_valid_youtube_url(url: str) -> bool:
     """Validate if the provided URL is a valid YouTube video URL."""
-    return bool(YOUTUBE_URL_REGEX.match(url))
+    # Every match has "youtu" within its first 17 characters ("https://www." + "youtu"),
+    # so most non-YouTube lines are rejected without running the regex
+    return 'youtu' in url[:17].lower() and YOUTUBE_URL_REGEX.match(url) is not None
+
+def unique_video_urls(urls: Iterable[str]) -> List[str]:
+    """Keep only the first URL for each video ID, however the link to it is written."""
+    urls_by_video = {}
+    for url in urls:
+        id_match = VIDEO_ID_REGEX.search(url)
+        # A URL without a recognisable video ID is only deduplicated against itself
+        urls_by_video.setdefault(id_match.group(1) if id_match else url, url)
+    return list(urls_by_video.values())
+
+def underscore_whitespace(text: str) -> str:
+    """Replace every run of whitespace in a string with a single underscore."""
+    words = text.split()
+    joined = '_'.join(words)
+    # str.split() drops leading and trailing whitespace, but each of those runs still becomes an underscore
+    if text[:1].isspace():
+        joined = '_' + joined
+    if words and text[-1:].isspace():
+        joined += '_'
+    return joined
 
 def sanitize_filename(title: str, max_length=255) -> str:
     """Sanitize a string to create a safe and clean filename."""
+    if title.isascii():
+        # Normalization is a no-op for ASCII and every character is a single byte
+        sanitized_title = title.translate(ASCII_ILLEGAL_CHAR_TABLE)
+        sanitized_title = underscore_whitespace(sanitized_title).strip(".")
+        return sanitized_title[:max_length].rstrip('_')
+
     sanitized_title = unicodedata.normalize('NFKD', title)
     sanitized_title = ILLEGAL_CHAR_PATTERN.sub('', sanitized_title)
-    sanitized_title = SPACE_PATTERN.sub('_', sanitized_title).strip(".")
-    sanitized_title = sanitized_title.encode('utf-8')[:max_length].decode('utf-8', 'ignore').rstrip('_')
-    return unicodedata.normalize('NFC', sanitized_title)
+    sanitized_title = underscore_whitespace(sanitized_title).strip(".")
+    # A UTF-8 character is at most 4 bytes, so short titles can skip the byte-length check
+    if len(sanitized_title) > max_length // 4:
+        encoded_title = sanitized_title.encode('utf-8')
+        if len(encoded_title) > max_length:
+            sanitized_title = encoded_title[:max_length].decode('utf-8', 'ignore')
+    return unicodedata.normalize('NFC', sanitized_title.rstrip('_'))
+
+def build_ydl_opts(
+    output_dir: Path,
+    cookies_file: Optional[Path] = None,
+    lang: str = 'en',
+    fmt: str = 'vtt',
+    verbose: bool = False
+) -> dict:
+    """Build the yt-dlp options for downloading only the subtitles of a video."""
+    return {
+        'skip_download': True,
+        'writesubtitles': True,
+        'writeautomaticsub': True,
+        'subtitlesformat': fmt,
+        'subtitleslangs': [lang],
+        'outtmpl': str(output_dir / '%(title)s.%(ext)s'),
+        'quiet': not verbose,
+        'no_warnings': not verbose,
+        'cookiefile': str(cookies_file) if cookies_file else None,
+        'buffersize': 1024 * 1024,  # Read 1 MiB at a time instead of yt-dlp's 1 KiB default
+    }
 
 def download_subtitles(
     video_url: str,
@@ -32,7 +93,8 @@ def download_subtitles(
     cookies_file: Optional[Path] = None,
     lang: str = 'en',
     fmt: str = 'vtt',
-    verbose: bool = False
+    verbose: bool = False,
+    ydl: Optional[yt_dlp.YoutubeDL] = None
 ) -> tuple:
     """
     Downloads subtitles for a YouTube video using yt-dlp.
@@ -45,6 +107,8 @@ def download_subtitles(
         lang (str): Subtitle language code (default: 'en').
         fmt (str): Subtitle format ('vtt' or 'srt').
         verbose (bool): Enable verbose output.
+        ydl (Optional[yt_dlp.YoutubeDL]): Existing instance built from build_ydl_opts to reuse
+            instead of creating one for this video.
 
     Returns:
         tuple: (success (bool), message (str))
@@ -54,23 +118,15 @@ def download_subtitles(
 
     output_dir.mkdir(parents=True, exist_ok=True)
 
-    ydl_opts = {
-        'skip_download': True,
-        'writesubtitles': True,
-        'writeautomaticsub': True,
-        'subtitlesformat': fmt,
-        'subtitleslangs': [lang],
-        'outtmpl': str(output_dir / '%(title)s.%(ext)s'),
-        'quiet': not verbose,
-        'no_warnings': not verbose,
-        'cookiefile': str(cookies_file) if cookies_file else None,
-    }
+    if ydl is None:
+        ydl_context = yt_dlp.YoutubeDL(build_ydl_opts(output_dir, cookies_file, lang, fmt, verbose))
+    else:
+        ydl_context = nullcontext(ydl)
 
     try:
-        with yt_dlp.YoutubeDL(ydl_opts) as ydl:
+        with ydl_context as ydl:
             info_dict = ydl.extract_info(video_url, download=False)
             title = sanitize_filename(info_dict.get('title', 'video'))
-            subtitle_file = output_dir / f"{title}.{fmt}"
 
             subtitles = info_dict.get('subtitles', {})
             auto_captions = info_dict.get('automatic_captions', {})
@@ -85,7 +141,16 @@ def download_subtitles(
             else:
                 return False, f"No subtitles found for language '{lang}'."
 
-            ydl.download([video_url])
+            # Resolve the path yt-dlp writes to, using the format it selected in case fmt was unavailable
+            requested = (info_dict.get('requested_subtitles') or {}).get(lang) or {}
+            subtitle_file = Path(yt_dlp.utils.subtitles_filename(
+                ydl.prepare_filename(info_dict, 'subtitle'), lang, requested.get('ext', fmt), info_dict.get('ext')
+            ))
+            if subtitle_file.exists() and subtitle_file.stat().st_size > 0:
+                return True, f"Subtitles already downloaded for: {title}"
+
+            # Download from the info already extracted instead of fetching the video page again
+            ydl.process_ie_result(info_dict, download=True)
 
             if verbose:
                 print(f"Subtitles downloaded to {subtitle_file.resolve()}")
@@ -101,7 +166,8 @@ def download_subtitles_from_file(
     cookies_file: Optional[Path] = None,
     lang: str = 'en',
     fmt: str = 'vtt',
-    verbose: bool = False
+    verbose: bool = False,
+    max_workers: int = MAX_WORKERS
 ):
     file_path = Path(file_path)
     if not file_path.exists():
@@ -109,28 +175,52 @@ def download_subtitles_from_file(
         file_path.touch()
         return
 
-    urls = file_path.read_text().splitlines()
-    if not urls:
+    if file_path.stat().st_size == 0:
         print(f"'{file_path.name}' is empty. Please add some video URLs to it.")
         return
 
-    valid_urls = [url.strip() for url in urls if is_valid_youtube_url(url.strip())]
+    # Validate lines as they are read and drop repeated links so each video is only fetched once
+    with file_path.open('r', encoding='utf-8') as url_file:
+        valid_urls = unique_video_urls(url for url in map(str.strip, url_file) if is_valid_youtube_url(url))
     if not valid_urls:
         print(f"No valid video URLs found in '{file_path.name}'.")
         return
 
-    print(f"Starting subtitle downloads for {len(valid_urls)} valid video URL(s)...")
-    for index, url in enumerate(valid_urls, start=1):
-        success, message = download_subtitles(
+    # YoutubeDL instances are not thread-safe, so each worker thread keeps its own
+    # and reuses it for every URL it handles instead of rebuilding one per video
+    thread_state = threading.local()
+    ydl_instances = []
+
+    def download(url):
+        ydl = getattr(thread_state, 'ydl', None)
+        if ydl is None:
+            ydl = thread_state.ydl = yt_dlp.YoutubeDL(build_ydl_opts(output_dir, cookies_file, lang, fmt, verbose))
+            ydl_instances.append(ydl)
+        return download_subtitles(
             url,
             output_dir,
             cookies_file=cookies_file,
             lang=lang,
             fmt=fmt,
-            verbose=verbose
+            verbose=verbose,
+            ydl=ydl
         )
-        status = "Success" if success else "Failed"
-        print(f"{index}. [{status}] {message}")
+
+    print(f"Starting subtitle downloads for {len(valid_urls)} valid video URL(s)...")
+    try:
+        with ThreadPoolExecutor(max_workers=min(max_workers, len(valid_urls))) as executor:
+            future_to_url = {executor.submit(download, url): url for url in valid_urls}
+            for index, future in enumerate(as_completed(future_to_url), start=1):
+                url = future_to_url[future]
+                try:
+                    success, message = future.result()
+                except Exception as e:
+                    success, message = False, f"Exception occurred while downloading subtitles for {url}: {e}"
+                status = "Success" if success else "Failed"
+                print(f"{index}. [{status}] {message}")
+    finally:
+        for ydl in ydl_instances:
+            ydl.close()
 
     print("Subtitle download session completed.")
 
@@ -3,7 +3,8 @@ from pathlib import Path
 import unicodedata
 import re
 import logging
-from typing import Optional, List, Tuple
+import threading
+from typing import Iterable, Optional, List, Tuple
 from concurrent.futures import ThreadPoolExecutor, as_completed
 
 # Configuration options
@@ -19,13 +20,35 @@ logger = logging.getLogger(__name__)
 
 # Pre-compiled regex patterns for filename sanitization
 ILLEGAL_CHAR_PATTERN = re.compile(r'[^\w\s-]')
-SPACE_PATTERN = re.compile(r'\s+')
+# Translation table deleting the ASCII characters ILLEGAL_CHAR_PATTERN would remove
+ASCII_ILLEGAL_CHAR_TABLE = str.maketrans({c: None for c in map(chr, range(128)) if ILLEGAL_CHAR_PATTERN.match(c)})
 YOUTUBE_URL_REGEX = re.compile(
     r'^(https?://)?(www\.)?'
     r'(youtube\.com/watch\?v=|youtube\.[a-z]{2,3}/watch\?v=|youtu\.be/)'
     r'[^&\s]+$',
     re.IGNORECASE
 )
+VIDEO_ID_REGEX = re.compile(r'(?:v=|youtu\.be/)([\w-]{11})', re.IGNORECASE)
+
+def unique_video_urls(urls: Iterable[str]) -> List[str]:
+    """Keep only the first URL for each video ID, however the link to it is written."""
+    urls_by_video = {}
+    for url in urls:
+        id_match = VIDEO_ID_REGEX.search(url)
+        # A URL without a recognisable video ID is only deduplicated against itself
+        urls_by_video.setdefault(id_match.group(1) if id_match else url, url)
+    return list(urls_by_video.values())
+
+def underscore_whitespace(text: str) -> str:
+    """Replace every run of whitespace in a string with a single underscore."""
+    words = text.split()
+    joined = '_'.join(words)
+    # str.split() drops leading and trailing whitespace, but each of those runs still becomes an underscore
+    if text[:1].isspace():
+        joined = '_' + joined
+    if words and text[-1:].isspace():
+        joined += '_'
+    return joined
 
 class YouTubeDownloader:
     def __init__(self, 
@@ -54,7 +77,10 @@ class YouTubeDownloader:
     @staticmethod
     def is_valid_youtube_url(url: str) -> bool:
         """Validate if the provided URL is a valid YouTube video URL."""
-        return bool(YOUTUBE_URL_REGEX.match(url.strip()))
+        url = url.strip()
+        # Every match has "youtu" within its first 17 characters ("https://www." + "youtu"),
+        # so most non-YouTube lines are rejected without running the regex
+        return 'youtu' in url[:17].lower() and YOUTUBE_URL_REGEX.match(url) is not None
 
     @staticmethod
     def sanitize_filename(title: str, max_length: int = 255) -> str:
@@ -68,11 +94,21 @@ class YouTubeDownloader:
         Returns:
             str: Sanitized filename.
         """
+        if title.isascii():
+            # Normalization is a no-op for ASCII and every character is a single byte
+            sanitized_title = title.translate(ASCII_ILLEGAL_CHAR_TABLE)
+            sanitized_title = underscore_whitespace(sanitized_title).strip(".")
+            return sanitized_title[:max_length].rstrip('_')
+
         sanitized_title = unicodedata.normalize('NFKD', title)
         sanitized_title = ILLEGAL_CHAR_PATTERN.sub('', sanitized_title)
-        sanitized_title = SPACE_PATTERN.sub('_', sanitized_title).strip(".")
-        sanitized_title = sanitized_title.encode('utf-8')[:max_length].decode('utf-8', 'ignore').rstrip('_')
-        return unicodedata.normalize('NFC', sanitized_title)
+        sanitized_title = underscore_whitespace(sanitized_title).strip(".")
+        # A UTF-8 character is at most 4 bytes, so short titles can skip the byte-length check
+        if len(sanitized_title) > max_length // 4:
+            encoded_title = sanitized_title.encode('utf-8')
+            if len(encoded_title) > max_length:
+                sanitized_title = encoded_title[:max_length].decode('utf-8', 'ignore')
+        return unicodedata.normalize('NFC', sanitized_title.rstrip('_'))
 
     def get_cookies_file(self) -> Optional[Path]:
         """
@@ -103,23 +139,17 @@ class YouTubeDownloader:
 
         return None
 
-    def download_video(self, video_url: str, cookies_file: Optional[Path] = None) -> Tuple[bool, str]:
+    def build_ydl_opts(self, cookies_file: Optional[Path] = None) -> dict:
         """
-        Download a single YouTube video using yt-dlp, ensuring the output is an MP4 file.
+        Build the yt-dlp options for downloading a video as an MP4 file.
 
         Args:
-            video_url (str): URL of the YouTube video.
             cookies_file (Optional[Path]): Path to the cookies.txt file for authentication.
 
         Returns:
-            Tuple[bool, str]: Success status and message.
+            dict: Options for yt_dlp.YoutubeDL.
         """
-        if not self.is_valid_youtube_url(video_url):
-            logger.error(f"Invalid URL: {video_url}")
-            return False, f"Invalid URL: {video_url}"
-
-        # Prepare yt-dlp options to ensure MP4 output
-        ydl_opts = {
+        return {
             'format': 'bestvideo[ext=mp4]+bestaudio[ext=m4a]/best[ext=mp4]/best',
             'outtmpl': str(self.download_path / '%(title)s.%(ext)s'),
             'quiet': not self.verbose,
@@ -132,20 +162,43 @@ class YouTubeDownloader:
             }],
         }
 
+    def download_video(self,
+                       video_url: str,
+                       cookies_file: Optional[Path] = None,
+                       ydl: Optional[yt_dlp.YoutubeDL] = None) -> Tuple[bool, str]:
+        """
+        Download a single YouTube video using yt-dlp, ensuring the output is an MP4 file.
+
+        Args:
+            video_url (str): URL of the YouTube video.
+            cookies_file (Optional[Path]): Path to the cookies.txt file for authentication.
+            ydl (Optional[yt_dlp.YoutubeDL]): Existing instance built from build_ydl_opts to reuse
+                instead of creating one for this video.
+
+        Returns:
+            Tuple[bool, str]: Success status and message.
+        """
+        if not self.is_valid_youtube_url(video_url):
+            logger.error(f"Invalid URL: {video_url}")
+            return False, f"Invalid URL: {video_url}"
+
         try:
-            with yt_dlp.YoutubeDL(ydl_opts) as ydl:
-                logger.debug(f"Starting download for: {video_url}")
+            logger.debug(f"Starting download for: {video_url}")
+            if ydl is None:
+                with yt_dlp.YoutubeDL(self.build_ydl_opts(cookies_file)) as ydl:
+                    info_dict = ydl.extract_info(video_url, download=True)
+            else:
                 info_dict = ydl.extract_info(video_url, download=True)
-                title = self.sanitize_filename(info_dict.get('title', 'video'))
-                ext = 'mp4'  # Ensure extension is mp4
-                video_file = self.download_path / f"{title}.{ext}"
+            title = self.sanitize_filename(info_dict.get('title', 'video'))
+            ext = 'mp4'  # Ensure extension is mp4
+            video_file = self.download_path / f"{title}.{ext}"
 
-                if video_file.exists():
-                    logger.info(f"Successfully downloaded: '{video_file}'")
-                    return True, f"Downloaded: {title}"
-                else:
-                    logger.error(f"Download completed but file not found: '{video_file}'")
-                    return False, f"Download completed but file not found: {title}"
+            if video_file.exists():
+                logger.info(f"Successfully downloaded: '{video_file}'")
+                return True, f"Downloaded: {title}"
+            else:
+                logger.error(f"Download completed but file not found: '{video_file}'")
+                return False, f"Download completed but file not found: {title}"
 
         except yt_dlp.utils.DownloadError as e:
             logger.error(f"Error downloading {video_url}: {e}")
@@ -165,24 +218,42 @@ class YouTubeDownloader:
             file_path.touch()
             return
 
-        urls = [line.strip() for line in file_path.read_text().splitlines() if self.is_valid_youtube_url(line.strip())]
+        # Validate lines as they are read and drop repeated links so each video is only fetched once
+        with file_path.open('r', encoding='utf-8') as url_file:
+            urls = unique_video_urls(url for url in map(str.strip, url_file) if self.is_valid_youtube_url(url))
         if not urls:
             logger.warning(f"No valid video URLs found in '{file_path.name}'.")
             return
 
         logger.info(f"Starting downloads for {len(urls)} video(s)...")
 
+        # YoutubeDL instances are not thread-safe, so each worker thread keeps its own
+        # and reuses it for every URL it handles instead of rebuilding one per video
+        thread_state = threading.local()
+        ydl_instances = []
+
+        def download(url: str) -> Tuple[bool, str]:
+            ydl = getattr(thread_state, 'ydl', None)
+            if ydl is None:
+                ydl = thread_state.ydl = yt_dlp.YoutubeDL(self.build_ydl_opts(cookies_file))
+                ydl_instances.append(ydl)
+            return self.download_video(url, cookies_file, ydl=ydl)
+
         # Use ThreadPoolExecutor for concurrent downloads
-        with ThreadPoolExecutor(max_workers=self.max_workers) as executor:
-            future_to_url = {executor.submit(self.download_video, url, cookies_file): url for url in urls}
-            for future in as_completed(future_to_url):
-                url = future_to_url[future]
-                try:
-                    success, message = future.result()
-                    status = "Success" if success else "Failed"
-                    logger.info(f"[{status}] {message}")
-                except Exception as e:
-                    logger.error(f"[Failed] Exception occurred while downloading {url}: {e}")
+        try:
+            with ThreadPoolExecutor(max_workers=self.max_workers) as executor:
+                future_to_url = {executor.submit(download, url): url for url in urls}
+                for future in as_completed(future_to_url):
+                    url = future_to_url[future]
+                    try:
+                        success, message = future.result()
+                        status = "Success" if success else "Failed"
+                        logger.info(f"[{status}] {message}")
+                    except Exception as e:
+                        logger.error(f"[Failed] Exception occurred while downloading {url}: {e}")
+        finally:
+            for ydl in ydl_instances:
+                ydl.close()
 
         logger.info("Download session completed.")
 
@@ -2,13 +2,18 @@ import yt_dlp
 from pathlib import Path
 import unicodedata
 import re
+import json
+import shutil
 import logging
-from typing import Optional, Tuple
+import threading
+from contextlib import nullcontext
+from typing import Iterable, List, Optional, Tuple
 from concurrent.futures import ThreadPoolExecutor, as_completed
 
 # Configuration options
 VERBOSE = False  # Toggle to True for verbose output
 MAX_WORKERS = 8  # Number of threads for concurrent downloads
+DOWNLOAD_INDEX = "download_index.json"  # File in the video folder mapping finished video IDs to their files
 
 # Set up logging
 logging.basicConfig(
@@ -19,13 +24,35 @@ logger = logging.getLogger(__name__)
 
 # Pre-compiled regex patterns for filename sanitization
 ILLEGAL_CHAR_PATTERN = re.compile(r'[^\w\s-]')
-SPACE_PATTERN = re.compile(r'\s+')
+# Translation table deleting the ASCII characters ILLEGAL_CHAR_PATTERN would remove
+ASCII_ILLEGAL_CHAR_TABLE = str.maketrans({c: None for c in map(chr, range(128)) if ILLEGAL_CHAR_PATTERN.match(c)})
 YOUTUBE_URL_REGEX = re.compile(
     r'^(https?://)?(www\.)?'
     r'(youtube\.com/watch\?v=|youtube\.[a-z]{2,3}/watch\?v=|youtu\.be/)'
     r'[^&\s]+$',
     re.IGNORECASE
 )
+VIDEO_ID_REGEX = re.compile(r'(?:v=|youtu\.be/)([\w-]{11})', re.IGNORECASE)
+
+def unique_video_urls(urls: Iterable[str]) -> List[str]:
+    """Keep only the first URL for each video ID, however the link to it is written."""
+    urls_by_video = {}
+    for url in urls:
+        id_match = VIDEO_ID_REGEX.search(url)
+        # A URL without a recognisable video ID is only deduplicated against itself
+        urls_by_video.setdefault(id_match.group(1) if id_match else url, url)
+    return list(urls_by_video.values())
+
+def underscore_whitespace(text: str) -> str:
+    """Replace every run of whitespace in a string with a single underscore."""
+    words = text.split()
+    joined = '_'.join(words)
+    # str.split() drops leading and trailing whitespace, but each of those runs still becomes an underscore
+    if text[:1].isspace():
+        joined = '_' + joined
+    if words and text[-1:].isspace():
+        joined += '_'
+    return joined
 
 class YouTubeDownloader:
     def __init__(self, 
@@ -48,6 +75,9 @@ class YouTubeDownloader:
         self.audio_path.mkdir(parents=True, exist_ok=True)
         self.verbose = verbose
         self.max_workers = max_workers
+        self.index_file = self.video_path / DOWNLOAD_INDEX
+        self.index_lock = threading.Lock()
+        self.download_index = self.load_download_index()
 
         # Update logger level based on verbosity
         if self.verbose:
@@ -58,7 +88,10 @@ class YouTubeDownloader:
     @staticmethod
     def is_valid_youtube_url(url: str) -> bool:
         """Validate if the provided URL is a valid YouTube video URL."""
-        return bool(YOUTUBE_URL_REGEX.match(url.strip()))
+        url = url.strip()
+        # Every match has "youtu" within its first 17 characters ("https://www." + "youtu"),
+        # so most non-YouTube lines are rejected without running the regex
+        return 'youtu' in url[:17].lower() and YOUTUBE_URL_REGEX.match(url) is not None
 
     @staticmethod
     def sanitize_filename(title: str, max_length: int = 255) -> str:
@@ -72,11 +105,49 @@ class YouTubeDownloader:
         Returns:
             str: Sanitized filename.
         """
+        if title.isascii():
+            # Normalization is a no-op for ASCII and every character is a single byte
+            sanitized_title = title.translate(ASCII_ILLEGAL_CHAR_TABLE)
+            sanitized_title = underscore_whitespace(sanitized_title).strip(".")
+            return sanitized_title[:max_length].rstrip('_')
+
         sanitized_title = unicodedata.normalize('NFKD', title)
         sanitized_title = ILLEGAL_CHAR_PATTERN.sub('', sanitized_title)
-        sanitized_title = SPACE_PATTERN.sub('_', sanitized_title).strip(".")
-        sanitized_title = sanitized_title.encode('utf-8')[:max_length].decode('utf-8', 'ignore').rstrip('_')
-        return unicodedata.normalize('NFC', sanitized_title)
+        sanitized_title = underscore_whitespace(sanitized_title).strip(".")
+        # A UTF-8 character is at most 4 bytes, so short titles can skip the byte-length check
+        if len(sanitized_title) > max_length // 4:
+            encoded_title = sanitized_title.encode('utf-8')
+            if len(encoded_title) > max_length:
+                sanitized_title = encoded_title[:max_length].decode('utf-8', 'ignore')
+        return unicodedata.normalize('NFC', sanitized_title.rstrip('_'))
+
+    def load_download_index(self) -> dict:
+        """
+        Load the index of downloads finished by earlier runs.
+
+        Returns:
+            dict: Mapping of video ID to the 'video' and 'audio' paths its files were saved to.
+        """
+        try:
+            return json.loads(self.index_file.read_text(encoding='utf-8'))
+        except FileNotFoundError:
+            return {}
+        except (OSError, ValueError) as e:
+            logger.warning(f"Ignoring unreadable download index '{self.index_file}': {e}")
+            return {}
+
+    def record_download(self, video_id: str, video_file: Path, audio_file: Path) -> None:
+        """
+        Add a finished download to the index and save it.
+
+        Args:
+            video_id (str): YouTube ID of the video.
+            video_file (Path): Path the MP4 was saved to.
+            audio_file (Path): Path the WAV was saved to.
+        """
+        with self.index_lock:
+            self.download_index[video_id] = {'video': str(video_file), 'audio': str(audio_file)}
+            self.index_file.write_text(json.dumps(self.download_index, ensure_ascii=False, indent=2), encoding='utf-8')
 
     def get_cookies_file(self) -> Optional[Path]:
         """
@@ -107,61 +178,92 @@ class YouTubeDownloader:
 
         return None
 
-    def download_video_and_audio(self, video_url: str, cookies_file: Optional[Path] = None) -> Tuple[bool, str]:
+    def build_ydl_opts(self, cookies_file: Optional[Path] = None) -> dict:
         """
-        Download a single YouTube video as MP4 and extract audio as WAV, saving them in different folders.
+        Build the yt-dlp options for downloading a video as MP4 into the video folder.
 
         Args:
-            video_url (str): URL of the YouTube video.
             cookies_file (Optional[Path]): Path to the cookies.txt file for authentication.
 
         Returns:
-            Tuple[bool, str]: Success status and message.
+            dict: Options for yt_dlp.YoutubeDL.
         """
-        if not self.is_valid_youtube_url(video_url):
-            logger.error(f"Invalid URL: {video_url}")
-            return False, f"Invalid URL: {video_url}"
-
-        # Prepare yt-dlp options
-        ydl_opts = {
+        return {
             'format': 'bestvideo[ext=mp4]+bestaudio[ext=m4a]/best[ext=mp4]/best',
             'outtmpl': '%(title)s.%(ext)s',
-            'paths': {
-                'video': str(self.video_path),
-                'audio': str(self.audio_path),
-            },
+            'paths': {'home': str(self.video_path)},
             'quiet': not self.verbose,
             'no_warnings': not self.verbose,
             'merge_output_format': 'mp4',
             'cookiefile': str(cookies_file) if cookies_file else None,
-            'postprocessors': [
-                {
-                    'key': 'FFmpegExtractAudio',
-                    'preferredcodec': 'wav',
-                }
-            ],
         }
 
+    def download_video_and_audio(self,
+                                 video_url: str,
+                                 cookies_file: Optional[Path] = None,
+                                 ydl: Optional[yt_dlp.YoutubeDL] = None) -> Tuple[bool, str]:
+        """
+        Download a single YouTube video as MP4 and extract audio as WAV, saving them in different folders.
+
+        Args:
+            video_url (str): URL of the YouTube video.
+            cookies_file (Optional[Path]): Path to the cookies.txt file for authentication.
+            ydl (Optional[yt_dlp.YoutubeDL]): Existing instance built from build_ydl_opts to reuse
+                instead of creating one for this video.
+
+        Returns:
+            Tuple[bool, str]: Success status and message.
+        """
+        if not self.is_valid_youtube_url(video_url):
+            logger.error(f"Invalid URL: {video_url}")
+            return False, f"Invalid URL: {video_url}"
+
+        # Videos finished by an earlier run are skipped without any network request,
+        # but only while both of their files are still in place
+        id_match = VIDEO_ID_REGEX.search(video_url)
+        video_id = id_match.group(1) if id_match else None
+        indexed_files = self.download_index.get(video_id)
+        if (indexed_files
+                and Path(indexed_files['video']).exists()
+                and Path(indexed_files['audio']).exists()):
+            video_file = Path(indexed_files['video'])
+            logger.info(f"Already downloaded, skipping: '{video_file.stem}'")
+            return True, f"Already downloaded: {video_file.stem}"
+
         try:
-            with yt_dlp.YoutubeDL(ydl_opts) as ydl:
-                logger.debug(f"Starting download for: {video_url}")
+            logger.debug(f"Starting download for: {video_url}")
+            if ydl is None:
+                ydl_context = yt_dlp.YoutubeDL(self.build_ydl_opts(cookies_file))
+            else:
+                ydl_context = nullcontext(ydl)
+            with ydl_context as ydl:
                 info_dict = ydl.extract_info(video_url, download=True)
                 title = self.sanitize_filename(info_dict.get('title', 'video'))
 
-                # Video file
-                video_file = self.video_path / f"{title}.mp4"
+                # Video file, at the path yt-dlp actually wrote it to
+                video_file = Path(info_dict['requested_downloads'][0]['filepath'])
                 if not video_file.exists():
                     logger.error(f"Download completed but video file not found: '{video_file}'")
                     return False, f"Download completed but video file not found: {title}"
 
-                # Audio file
-                audio_file = self.audio_path / f"{title}.wav"
-                if not audio_file.exists():
-                    logger.error(f"Audio extraction completed but file not found: '{audio_file}'")
-                    return False, f"Audio extraction completed but file not found: {title}"
-
-                logger.info(f"Successfully downloaded video and extracted audio for: '{title}'")
-                return True, f"Downloaded and processed: {title}"
+                # Extract the audio here rather than through the postprocessors option, which deletes
+                # the MP4 unless keepvideo is set, and keepvideo also keeps the separate stream files
+                _, audio_info = yt_dlp.postprocessor.FFmpegExtractAudioPP(ydl, preferredcodec='wav').run(
+                    {**info_dict, 'filepath': str(video_file), 'ext': video_file.suffix[1:]}
+                )
+
+            # Audio file, moved from beside the video into the audio folder
+            extracted_file = Path(audio_info['filepath'])
+            if extracted_file == video_file or not extracted_file.exists():
+                logger.error(f"Audio extraction completed but file not found: '{extracted_file}'")
+                return False, f"Audio extraction completed but file not found: {title}"
+            audio_file = self.audio_path / extracted_file.name
+            shutil.move(str(extracted_file), str(audio_file))
+
+            if video_id:
+                self.record_download(video_id, video_file, audio_file)
+            logger.info(f"Successfully downloaded video and extracted audio for: '{title}'")
+            return True, f"Downloaded and processed: {title}"
 
         except yt_dlp.utils.DownloadError as e:
             logger.error(f"Error downloading {video_url}: {e}")
@@ -184,24 +286,42 @@ class YouTubeDownloader:
             file_path.touch()
             return
 
-        urls = [line.strip() for line in file_path.read_text().splitlines() if self.is_valid_youtube_url(line.strip())]
+        # Validate lines as they are read and drop repeated links so each video is only fetched once
+        with file_path.open('r', encoding='utf-8') as url_file:
+            urls = unique_video_urls(url for url in map(str.strip, url_file) if self.is_valid_youtube_url(url))
         if not urls:
             logger.warning(f"No valid video URLs found in '{file_path.name}'.")
             return
 
         logger.info(f"Starting downloads for {len(urls)} video(s)...")
 
+        # YoutubeDL instances are not thread-safe, so each worker thread keeps its own
+        # and reuses it for every URL it handles instead of rebuilding one per video
+        thread_state = threading.local()
+        ydl_instances = []
+
+        def download(url: str) -> Tuple[bool, str]:
+            ydl = getattr(thread_state, 'ydl', None)
+            if ydl is None:
+                ydl = thread_state.ydl = yt_dlp.YoutubeDL(self.build_ydl_opts(cookies_file))
+                ydl_instances.append(ydl)
+            return self.download_video_and_audio(url, cookies_file, ydl=ydl)
+
         # Use ThreadPoolExecutor for concurrent downloads
-        with ThreadPoolExecutor(max_workers=self.max_workers) as executor:
-            future_to_url = {executor.submit(self.download_video_and_audio, url, cookies_file): url for url in urls}
-            for future in as_completed(future_to_url):
-                url = future_to_url[future]
-                try:
-                    success, message = future.result()
-                    status = "Success" if success else "Failed"
-                    logger.info(f"[{status}] {message}")
-                except Exception as e:
-                    logger.error(f"[Failed] Exception occurred while processing {url}: {e}")
+        try:
+            with ThreadPoolExecutor(max_workers=self.max_workers) as executor:
+                future_to_url = {executor.submit(download, url): url for url in urls}
+                for future in as_completed(future_to_url):
+                    url = future_to_url[future]
+                    try:
+                        success, message = future.result()
+                        status = "Success" if success else "Failed"
+                        logger.info(f"[{status}] {message}")
+                    except Exception as e:
+                        logger.error(f"[Failed] Exception occurred while processing {url}: {e}")
+        finally:
+            for ydl in ydl_instances:
+                ydl.close()
 
         logger.info("Download session completed.")
 